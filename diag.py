@@ -1,8 +1,21 @@
+import argparse
+import matplotlib
+
+parser = argparse.ArgumentParser(description="Draw a recursive doubling step on a 16-node line.")
+parser.add_argument("--save", metavar="PNG", help="Write the figure to PNG instead of opening a window")
+args = parser.parse_args()
+
+# Headless when saving: skip GUI backend probing entirely.
+if args.save:
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import numpy as np
 
-def draw_step(arcs, congested_links, step_name):
+from plot_utils import FAST_PNG
+
+def draw_step(arcs, congested_links, step_name, save_path=None):
     fig, ax = plt.subplots(figsize=(12,2))
     
     # Draw nodes
@@ -28,7 +41,14 @@ def draw_step(arcs, congested_links, step_name):
     ax.set_ylim(-1,1)
     ax.axis('off')
     plt.title(step_name)
-    plt.show()
+    if save_path:
+        png_kwargs = {}
+        if save_path.lower().endswith(".png"):
+            png_kwargs["pil_kwargs"] = FAST_PNG
+        fig.savefig(save_path, **png_kwargs)
+        plt.close(fig)
+    else:
+        plt.show()
 
 # Example: Step 1 Recursive Doubling
 arcs = [
@@ -36,4 +56,4 @@ arcs = [
     (8,10,'blue'), (9,11,'blue'), (12,14,'blue'), (13,15,'blue')
 ]
 congested = [(1,2), (5,6)]
-draw_step(arcs, congested, "Recursive Doubling – Step 1")
+draw_step(arcs, congested, "Recursive Doubling – Step 1", args.save)
@@ -9,29 +9,29 @@ Usage:
 from __future__ import annotations
 
 import argparse
-import csv
 from pathlib import Path
 from typing import List
 
+import matplotlib
+
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
+
+from plot_utils import FAST_PNG
 
 
 def load_algorithms(csv_path: Path) -> List[str]:
     if not csv_path.exists():
         raise SystemExit(f"Error: {csv_path} not found. Run the C++ simulation first.")
 
-    algorithms: List[str] = []
-    with csv_path.open("r", newline="") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            algo = row["Algorithm"]
-            if algo not in algorithms:
-                algorithms.append(algo)
-    return algorithms
+    algorithms = pd.read_csv(csv_path, usecols=["Algorithm"])["Algorithm"]
+    return algorithms.drop_duplicates().tolist()
 
 
-def draw_legend(algorithms: List[str], output_path: Path) -> None:
+def draw_legend(algorithms: List[str], output_path: Path, dpi: int = 150) -> None:
     if not algorithms:
         raise SystemExit("No algorithms found in CSV; cannot draw legend.")
 
@@ -63,7 +63,8 @@ def draw_legend(algorithms: List[str], output_path: Path) -> None:
     legend.set_title("Algorithms", prop={"weight": "bold"})
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    fig.savefig(output_path, dpi=300, bbox_inches="tight")
+    png_kwargs = {"pil_kwargs": FAST_PNG} if output_path.suffix.lower() == ".png" else {}
+    fig.savefig(output_path, dpi=dpi, bbox_inches="tight", **png_kwargs)
     plt.close(fig)
     print(f"Saved legend to {output_path}")
 
@@ -82,10 +83,11 @@ def main() -> None:
         default=Path("animations/legend.png"),
         help="Path to output PNG (default: animations/legend.png)",
     )
+    parser.add_argument("--dpi", type=int, default=150, help="Output resolution in DPI (default: 150)")
     args = parser.parse_args()
 
     algorithms = load_algorithms(args.csv)
-    draw_legend(algorithms, args.output)
+    draw_legend(algorithms, args.output, args.dpi)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # only writes PNGs; skip GUI backend probing
 import matplotlib.pyplot as plt
 import numpy as np
 
+from plot_utils import FAST_PNG
+
 # 1. Load the Data
 try:
     df = pd.read_csv("benchmark_results.csv")
@@ -20,9 +24,14 @@ def format_bytes(size):
         count += 1
     return f"{int(n)}{power_labels[count]}B"
 
-# Get unique algorithms
-algorithms = df['Algorithm'].unique()
-colors = plt.cm.tab10(np.linspace(0, 1, len(algorithms)))
+# Group once by algorithm. Grouping the unsorted frame keeps first-appearance
+# order in the CSV, matching legend_palette.py's colors; each group is then
+# ordered by message size on its own.
+groups = [
+    (algo, subset.sort_values('VectorSizeBytes'))
+    for algo, subset in df.groupby('Algorithm', sort=False)
+]
+colors = plt.cm.tab10(np.linspace(0, 1, len(groups)))
 
 # --- PLOT 1: Latency (Time vs Size) ---
 plt.figure(figsize=(12, 6))
@@ -30,16 +39,15 @@ plt.title("Allreduce Latency (Lower is Better)")
 plt.xlabel("Message Size (Bytes)")
 plt.ylabel("Time (microseconds)")
 
-for algo, color in zip(algorithms, colors):
-    subset = df[df['Algorithm'] == algo]
-    plt.plot(subset['VectorSizeBytes'], subset['Time_us'], marker='o', label=algo, color=color)
+for (algo, subset), color in zip(groups, colors):
+    plt.plot(subset['VectorSizeBytes'].values, subset['Time_us'].values, marker='o', label=algo, color=color)
 
 plt.xscale('log', base=2)
 plt.yscale('log') # Log scale is usually better for latency spanning orders of magnitude
 plt.grid(True, which="both", ls="-", alpha=0.2)
 plt.legend()
 plt.tight_layout()
-plt.savefig("graph_latency.png")
+plt.savefig("graph_latency.png", pil_kwargs=FAST_PNG)
 print("Generated graph_latency.png")
 
 # --- PLOT 2: Goodput (Bandwidth vs Size) ---
@@ -48,14 +56,13 @@ plt.title("Allreduce Goodput (Higher is Better)")
 plt.xlabel("Message Size (Bytes)")
 plt.ylabel("Goodput (Gbps)")
 
-for algo, color in zip(algorithms, colors):
-    subset = df[df['Algorithm'] == algo]
-    plt.plot(subset['VectorSizeBytes'], subset['Goodput_Gbps'], marker='s', label=algo, color=color)
+for (algo, subset), color in zip(groups, colors):
+    plt.plot(subset['VectorSizeBytes'].values, subset['Goodput_Gbps'].values, marker='s', label=algo, color=color)
 
 plt.xscale('log', base=2)
 # We don't usually log-scale the Y-axis for Bandwidth, but you can if ranges are extreme
 plt.grid(True, which="both", ls="-", alpha=0.2)
 plt.legend()
 plt.tight_layout()
-plt.savefig("graph_goodput.png")
+plt.savefig("graph_goodput.png", pil_kwargs=FAST_PNG)
 print("Generated graph_goodput.png")
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Shared figure cache for the plotting scripts.
+
+Creating a matplotlib Figure is the expensive part of a small plot (font
+lookups, canvas setup), so scripts that render many images of the same size
+reuse one Figure per (owner, figsize) instead of building and closing a new
+one each time.
+
+pyplot is imported lazily so each script can select its backend first.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# pil_kwargs for savefig: zlib level 1 gives somewhat larger PNGs that save
+# much faster. Only pass it for .png output; the SVG/PDF writers reject it.
+FAST_PNG = {"compress_level": 1, "optimize": False}
+
+_SUBPLOT_PARAMS = ("left", "bottom", "right", "top", "wspace", "hspace")
+
+_FIG_CACHE: Dict[Tuple[str, float, float], "Figure"] = {}
+
+
+def cached_figure(owner: str, figsize: Tuple[float, float]) -> "Figure":
+    """Return this process's Figure for (owner, figsize), reset to a blank state.
+
+    Each call clears the figure, so anything an earlier caller drew on it with
+    the same owner and size is gone. Callers that keep axes across calls must
+    be the only user of their owner key in the process.
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    key = (owner, float(figsize[0]), float(figsize[1]))
+    fig = _FIG_CACHE.get(key)
+    if fig is None:
+        fig = plt.figure(figsize=key[1:])
+        _FIG_CACHE[key] = fig
+    else:
+        # clear() keeps subplot params (e.g. from tight_layout) and the
+        # background, so put both back to what a new figure would have.
+        fig.clear()
+        defaults = {p: matplotlib.rcParams[f"figure.subplot.{p}"] for p in _SUBPLOT_PARAMS}
+        fig.subplots_adjust(**defaults)
+        fig.patch.set_facecolor(matplotlib.rcParams["figure.facecolor"])
+    return fig
@@ -12,27 +12,23 @@ import math
 from pathlib import Path
 from typing import Literal
 
-import matplotlib.pyplot as plt
-import numpy as np
+import matplotlib
 
+matplotlib.use("Agg")
 
-Variant = Literal["bandwidth", "latency"]
+import numpy as np
 
+from plot_utils import FAST_PNG, cached_figure
 
-def rho(step: int) -> int:
-    """ρ(s) = Σ (i=0..s) (-2)^i."""
-    total = 0
-    for i in range(step + 1):
-        total += (1 << i) if i % 2 == 0 else -(1 << i)
-    return total
+
+Variant = Literal["bandwidth", "latency"]
 
 
-def pi(rank: int, step: int, world_size: int) -> int:
-    """π(r,s) – communication partner for rank r at step s."""
-    offset = rho(step)
-    if rank % 2 == 0:
-        return (rank + offset) % world_size
-    return (rank - offset) % world_size
+def rho_table(steps: int) -> np.ndarray:
+    """ρ(s) = Σ (i=0..s) (-2)^i for every s in [0, steps), as one prefix sum."""
+    exponents = np.arange(steps, dtype=np.int64)
+    signs = np.where(exponents % 2 == 0, 1, -1)
+    return np.cumsum(signs * (1 << exponents))
 
 
 def swing_steps(world_size: int) -> int:
@@ -43,33 +39,46 @@ def swing_steps(world_size: int) -> int:
     return int(math.log2(world_size)) + 1
 
 
-def accumulate_step(matrix: np.ndarray, world_size: int, step: int, bytes_per_send: float) -> None:
-    for rank in range(world_size):
-        peer = pi(rank, step, world_size)
-        matrix[rank, peer] += bytes_per_send
+def accumulate_step(matrix: np.ndarray, offset: int, bytes_per_send: float) -> None:
+    """Add one step's traffic for all ranks: π(r,s) = r ± ρ(s) (+ for even r, − for odd)."""
+    world_size = matrix.shape[0]
+    ranks = np.arange(world_size)
+    peers = np.where(ranks % 2 == 0, ranks + offset, ranks - offset) % world_size
+    np.add.at(matrix, (ranks, peers), bytes_per_send)
 
 
 def build_matrix(world_size: int, vector_size: int, variant: Variant) -> np.ndarray:
     matrix = np.zeros((world_size, world_size), dtype=float)
     steps = swing_steps(world_size)
+    offsets = rho_table(steps)
 
     if variant == "bandwidth":
         for s in range(steps):
             data_size = vector_size / (1 << (s + 1))
-            accumulate_step(matrix, world_size, s, data_size)
+            accumulate_step(matrix, offsets[s], data_size)
         for s in range(steps - 1, -1, -1):
             data_size = vector_size / (1 << (s + 1))
-            accumulate_step(matrix, world_size, s, data_size)
+            accumulate_step(matrix, offsets[s], data_size)
     else:  # latency-optimal: full vector each step
         for s in range(steps):
-            accumulate_step(matrix, world_size, s, vector_size)
+            accumulate_step(matrix, offsets[s], vector_size)
 
     return matrix
 
 
-def draw_heatmap(matrix: np.ndarray, title: str, output_path: Path) -> None:
-    fig, ax = plt.subplots(figsize=(10, 9))
+def draw_heatmap(
+    matrix: np.ndarray, title: str, output_path: Path, dpi: int = 150, compress: bool = False
+) -> None:
+    fig = cached_figure("swing_heatmap", (10, 9))
+    _draw_heatmap(fig, matrix, title)
+    fast_png = not compress and output_path.suffix.lower() == ".png"
+    fig.savefig(output_path, dpi=dpi, **({"pil_kwargs": FAST_PNG} if fast_png else {}))
+
+
+def _draw_heatmap(fig, matrix: np.ndarray, title: str) -> None:
+    ax = fig.add_subplot()
     im = ax.imshow(matrix, cmap="viridis")
+    im.set_rasterized(True)
 
     process_ids = np.arange(matrix.shape[0])
     ax.set_xticks(process_ids)
@@ -79,24 +88,23 @@ def draw_heatmap(matrix: np.ndarray, title: str, output_path: Path) -> None:
     ax.set_title(title)
 
     vmax = matrix.max() if matrix.max() > 0 else 1.0
-    for i in range(matrix.shape[0]):
-        for j in range(matrix.shape[1]):
-            value = matrix[i, j]
-            if value == 0:
-                label = "0"
-            elif value.is_integer():
-                label = f"{int(value)}"
-            else:
-                label = f"{value:.1f}"
-            text_color = "white" if value > vmax * 0.45 else "black"
-            ax.text(j, i, label, ha="center", va="center", color=text_color, fontsize=8)
+    # Format every label and pick text colors up front, then only create Text
+    # artists for cells that actually carry traffic (O(nnz) instead of O(N²)).
+    is_integer = matrix.astype(np.int64) == matrix
+    labels = np.where(
+        is_integer,
+        np.char.mod("%d", matrix.astype(np.int64)),
+        np.char.mod("%.1f", matrix),
+    )
+    light_text = matrix > vmax * 0.45
+    for i, j in np.argwhere(matrix > 0):
+        text_color = "white" if light_text[i, j] else "black"
+        ax.text(j, i, labels[i, j], ha="center", va="center", color=text_color, fontsize=8)
 
     cbar = fig.colorbar(im, ax=ax)
     cbar.set_label("Communication Volume (Bytes)")
 
     fig.tight_layout()
-    fig.savefig(output_path, dpi=300)
-    plt.close(fig)
 
 
 def main() -> None:
@@ -115,11 +123,17 @@ def main() -> None:
         default=Path("swing_heatmap.png"),
         help="Output image path (default: swing_heatmap.png)",
     )
+    parser.add_argument("--dpi", type=int, default=150, help="Output resolution in DPI (default: 150)")
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Use full PNG compression (smaller file, slower save)",
+    )
     args = parser.parse_args()
 
     matrix = build_matrix(args.processes, args.vector_size, args.variant)  # type: ignore[arg-type]
     title = f"Swing Allreduce ({args.variant.capitalize()}-Optimal): {args.processes} Processes"
-    draw_heatmap(matrix, title, args.output)
+    draw_heatmap(matrix, title, args.output, args.dpi, args.compress)
     print(f"Saved heatmap to {args.output}")
 
 
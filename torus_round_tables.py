@@ -14,13 +14,30 @@ by allgather) on a small 1D torus.
 from __future__ import annotations
 
 import argparse
-import copy
+import functools
+import multiprocessing
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")
 
 import matplotlib.pyplot as plt
 import numpy as np
 
+from plot_utils import FAST_PNG, cached_figure
+
+# (step index, per-process table rows, phase name) – everything needed to
+# render one round, so rendering can happen after the simulation finishes.
+Round = Tuple[int, List[Dict], str]
+
+# Marks a chunk slot a rank does not hold. Every held chunk has at least one
+# contributor bit set, so mask 0 is free to mean "absent". Masks live in
+# uint64 cells, which caps the torus at 64 processes.
+EMPTY = 0
+MAX_PROCS = 64
+
 
 def human_bytes(num_bytes: int) -> str:
     units = ["B", "KB", "MB", "GB"]
@@ -32,14 +49,27 @@ def human_bytes(num_bytes: int) -> str:
     return f"{value:.0f}{units[unit]}"
 
 
-def format_chunk(chunk: Dict) -> str:
-    contributors = "+".join(f"P{p}" for p in sorted(chunk["contributors"]))
-    return f"C{chunk['idx']}[{contributors}]"
+@functools.lru_cache(maxsize=None)
+def format_chunk(idx: int, mask: int) -> str:
+    # mask is the contributors bitmask (bit p set = P{p} contributed); peeling
+    # off the lowest set bit each time yields the ranks in ascending order.
+    bits = mask
+    parts = []
+    while bits:
+        low = bits & -bits
+        parts.append(f"P{low.bit_length() - 1}")
+        bits ^= low
+    return f"C{idx}[{'+'.join(parts)}]"
 
 
-def summarize_holdings(holdings: Dict[int, Dict]) -> str:
-    ordered = [holdings[idx] for idx in sorted(holdings.keys())]
-    return "\n".join(format_chunk(ch) for ch in ordered)
+def summarize_holdings(mask_row: np.ndarray) -> str:
+    held = np.flatnonzero(mask_row != EMPTY)
+    return _summarize(tuple(zip(held.tolist(), mask_row[held].tolist())))
+
+
+@functools.lru_cache(maxsize=None)
+def _summarize(chunks: Tuple[Tuple[int, int], ...]) -> str:
+    return "\n".join(format_chunk(idx, mask) for idx, mask in chunks)
 
 
 def draw_ring(ax, num_procs: int, messages: List[Tuple[int, int, str, str]]) -> None:
@@ -101,178 +131,222 @@ def draw_ring(ax, num_procs: int, messages: List[Tuple[int, int, str, str]]) ->
     ax.axis("off")
 
 
-def render_step(step_idx: int, rows: List[Dict], phase: str, num_procs: int, output_dir: Path) -> None:
-    color_palette = plt.cm.tab10(np.linspace(0, 1, num_procs))
-    table_rows = []
-    messages = []
-    for row in rows:
-        chunk_index = int(row["send_chunk"][1:])
-        chunk_color = color_palette[chunk_index % len(color_palette)]
-        table_rows.append(
-            [
-                f"P{row['process']}",
-                f"P{row['send_to']}",
-                f"{row['send_chunk']} ({row['send_label']})",
-                human_bytes(row['bytes_sent']),
-                f"P{row['recv_from']}",
-                f"{row['recv_chunk']} ({row['recv_label']})",
-                human_bytes(row['bytes_recv']),
-                row['data_held'],
-            ]
+COL_LABELS = [
+    "Process",
+    "Send →",
+    "Chunk Sent",
+    "Bytes Sent",
+    "Receive ←",
+    "Chunk Received",
+    "Bytes Recv",
+    "Data Held After",
+]
+
+
+class RoundRenderer:
+    """Renders every round onto one persistent figure.
+
+    The figure comes from the shared plot_utils cache and the gridspec and axes
+    are built once; each round only clears the two axes and redraws the ring
+    and table.
+
+    Only one renderer per num_procs may exist in a process: a second one
+    would get the same cached figure and clear the first one's axes.
+    render_rounds guarantees this by giving each pool worker one renderer.
+
+    ax.table() sizes its rows from the axes height at creation time, so each
+    round builds its table on the untightened gridspec positions (as a fresh
+    figure would) and only then applies the tight layout.
+    """
+
+    def __init__(self, num_procs: int, output_dir: Path, dpi: int = 150) -> None:
+        self.num_procs = num_procs
+        self.output_dir = output_dir
+        self.dpi = dpi
+        self.color_palette = plt.cm.tab10(np.linspace(0, 1, num_procs))
+        self.fig = cached_figure("torus_round", (14, 5 + num_procs * 0.4))
+        self.fig.patch.set_facecolor("#fdf8f1")
+        gs = self.fig.add_gridspec(2, 1, height_ratios=[1.3, max(2, num_procs * 0.45)])
+        self.ax_ring = self.fig.add_subplot(gs[0])
+        self.ax_table = self.fig.add_subplot(gs[1])
+        self._axes = (self.ax_ring, self.ax_table)
+        self._base_positions = [ax.get_position() for ax in self._axes]
+        self._tight_positions = None
+
+    def reset(self) -> None:
+        for ax, position in zip(self._axes, self._base_positions):
+            ax.cla()
+            ax.set_position(position)
+        self.ax_table.axis("off")
+
+    def render_step(self, step_idx: int, rows: List[Dict], phase: str) -> None:
+        color_palette = self.color_palette
+        table_rows = []
+        messages = []
+        for row in rows:
+            chunk_index = int(row["send_chunk"][1:])
+            chunk_color = color_palette[chunk_index % len(color_palette)]
+            table_rows.append(
+                [
+                    f"P{row['process']}",
+                    f"P{row['send_to']}",
+                    f"{row['send_chunk']} ({row['send_label']})",
+                    human_bytes(row['bytes_sent']),
+                    f"P{row['recv_from']}",
+                    f"{row['recv_chunk']} ({row['recv_label']})",
+                    human_bytes(row['bytes_recv']),
+                    row['data_held'],
+                ]
+            )
+            messages.append((row["process"], row["send_to"], row["send_chunk"], chunk_color))
+
+        self.reset()
+        draw_ring(self.ax_ring, self.num_procs, messages)
+        self.ax_ring.set_title(f"{phase} – Round {step_idx}", fontsize=14, fontweight="bold")
+
+        table = self.ax_table.table(
+            cellText=table_rows,
+            colLabels=COL_LABELS,
+            loc="center",
+            cellLoc="center",
         )
-        messages.append((row["process"], row["send_to"], row["send_chunk"], chunk_color))
-
-    fig = plt.figure(figsize=(14, 5 + num_procs * 0.4))
-    fig.patch.set_facecolor("#fdf8f1")
-    gs = fig.add_gridspec(2, 1, height_ratios=[1.3, max(2, num_procs * 0.45)])
-    ax_ring = fig.add_subplot(gs[0])
-    ax_table = fig.add_subplot(gs[1])
-    ax_table.axis("off")
-
-    draw_ring(ax_ring, num_procs, messages)
-    ax_ring.set_title(f"{phase} – Round {step_idx}", fontsize=14, fontweight="bold")
-
-    col_labels = [
-        "Process",
-        "Send →",
-        "Chunk Sent",
-        "Bytes Sent",
-        "Receive ←",
-        "Chunk Received",
-        "Bytes Recv",
-        "Data Held After",
-    ]
-
-    table = ax_table.table(
-        cellText=table_rows,
-        colLabels=col_labels,
-        loc="center",
-        cellLoc="center",
-    )
-    table.auto_set_font_size(False)
-    table.set_fontsize(9)
-    table.scale(1.3, 1.6)
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        table.scale(1.3, 1.6)
+
+        if self._tight_positions is None:
+            self.fig.tight_layout()
+            self._tight_positions = [ax.get_position() for ax in self._axes]
+        else:
+            for ax, position in zip(self._axes, self._tight_positions):
+                ax.set_position(position)
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        outfile = self.output_dir / f"{phase.lower().replace(' ', '_')}_round_{step_idx}.png"
+        self.fig.savefig(outfile, dpi=self.dpi, pil_kwargs=FAST_PNG)
+        print(f"Saved {outfile}")
+
+# Per-worker renderer, created once by the pool initializer so each process
+# keeps reusing its own figure.
+_worker_renderer: Optional[RoundRenderer] = None
+
+
+def _init_worker(num_procs: int, output_dir: Path, dpi: int) -> None:
+    global _worker_renderer
+    _worker_renderer = RoundRenderer(num_procs, output_dir, dpi)
 
-    output_dir.mkdir(parents=True, exist_ok=True)
-    outfile = output_dir / f"{phase.lower().replace(' ', '_')}_round_{step_idx}.png"
-    fig.tight_layout()
-    fig.savefig(outfile, dpi=300)
-    plt.close(fig)
-    print(f"Saved {outfile}")
 
+def _render_round(step_idx: int, rows: List[Dict], phase: str) -> None:
+    _worker_renderer.render_step(step_idx, rows, phase)
 
-def simulate_reduce_scatter(num_procs: int, vector_size: int, output_dir: Path):
+
+def render_rounds(
+    rounds: List[Round],
+    num_procs: int,
+    output_dir: Path,
+    dpi: int = 150,
+    workers: Optional[int] = None,
+) -> None:
+    """Render independent rounds in parallel across a process pool.
+
+    Every render_step restores the same axes layout, so the PNGs do not
+    depend on how many workers there are or which rounds each one gets.
+    """
+    if not rounds:
+        return
+    workers = min(len(rounds), workers or multiprocessing.cpu_count())
+    with multiprocessing.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(num_procs, output_dir, dpi),
+    ) as pool:
+        pool.starmap(_render_round, rounds)
+
+
+def build_rows(
+    num_procs: int,
+    chunk_bytes: int,
+    holdings: np.ndarray,
+    send_idx: np.ndarray,
+    send_masks: np.ndarray,
+    recv_idx: np.ndarray,
+    recv_masks: np.ndarray,
+) -> List[Dict]:
+    """Per-process table rows for one round, read from the post-round state."""
+    send_idx, send_masks = send_idx.tolist(), send_masks.tolist()
+    recv_idx, recv_masks = recv_idx.tolist(), recv_masks.tolist()
+    rows: List[Dict] = []
+    for r in range(num_procs):
+        rows.append(
+            {
+                "process": r,
+                "send_to": (r + 1) % num_procs,
+                "recv_from": (r - 1 + num_procs) % num_procs,
+                "send_chunk": f"C{send_idx[r]}",
+                "send_label": format_chunk(send_idx[r], send_masks[r]),
+                "bytes_sent": chunk_bytes,
+                "recv_chunk": f"C{recv_idx[r]}",
+                "recv_label": format_chunk(recv_idx[r], recv_masks[r]),
+                "bytes_recv": chunk_bytes,
+                "data_held": summarize_holdings(holdings[r]),
+            }
+        )
+    return rows
+
+
+def simulate_reduce_scatter(num_procs: int, vector_size: int):
     chunk_bytes = vector_size // num_procs
-    holdings = {r: {r: {"idx": r, "contributors": {r}}} for r in range(num_procs)}
-    last_received = {r: r for r in range(num_procs)}
+    ranks = np.arange(num_procs)
+    rank_bits = np.uint64(1) << ranks.astype(np.uint64)
+    # holdings[r, idx] is the contributors mask of chunk idx held by rank r,
+    # or EMPTY if r does not hold it.
+    holdings = np.full((num_procs, num_procs), EMPTY, dtype=np.uint64)
+    holdings[ranks, ranks] = rank_bits
+    last_received = ranks.copy()
+    rounds: List[Round] = []
 
     for step in range(num_procs - 1):
-        transmissions: Dict[int, Dict] = {}
-        rows: List[Dict] = []
-
-        for r in range(num_procs):
-            send_to = (r + 1) % num_procs
-            recv_from = (r - 1 + num_procs) % num_procs
-            send_idx = (r - step) % num_procs
-            chunk = holdings[r].pop(send_idx)
-            transmissions[send_to] = {
-                "sender": r,
-                "chunk_idx": send_idx,
-                "chunk": chunk,
-            }
-            rows.append(
-                {
-                    "process": r,
-                    "send_to": send_to,
-                    "recv_from": recv_from,
-                    "send_chunk": f"C{send_idx}",
-                    "send_label": format_chunk(chunk),
-                    "bytes_sent": chunk_bytes,
-                }
-            )
+        send_idx = (ranks - step) % num_procs
+        send_masks = holdings[ranks, send_idx]
+        holdings[ranks, send_idx] = EMPTY
 
-        for row in rows:
-            r = row["process"]
-            recv_idx = (r - step - 1) % num_procs
-            incoming = transmissions[r]
-            chunk = incoming["chunk"]
-            chunk["contributors"].add(r)
-            holdings[r][recv_idx] = chunk
-            last_received[r] = recv_idx
-
-            row.update(
-                {
-                    "recv_chunk": f"C{recv_idx}",
-                    "recv_label": format_chunk(chunk),
-                    "bytes_recv": chunk_bytes,
-                    "data_held": summarize_holdings(holdings[r]),
-                }
-            )
+        # Rank r receives what r - 1 sent and folds in its own contribution.
+        recv_idx = np.roll(send_idx, 1)
+        recv_masks = np.roll(send_masks, 1) | rank_bits
+        holdings[ranks, recv_idx] = recv_masks
+        last_received = recv_idx
 
-        render_step(step, rows, "Reduce-Scatter", num_procs, output_dir)
+        rows = build_rows(num_procs, chunk_bytes, holdings, send_idx, send_masks, recv_idx, recv_masks)
+        rounds.append((step, rows, "Reduce-Scatter"))
 
-    return holdings, last_received
+    return holdings, last_received, rounds
 
 
 def simulate_allgather(
     num_procs: int,
     vector_size: int,
-    output_dir: Path,
-    initial_holdings: Dict[int, Dict[int, Dict]],
-    last_received: Dict[int, int],
+    initial_holdings: np.ndarray,
+    last_received: np.ndarray,
 ):
     chunk_bytes = vector_size // num_procs
-    holdings = {
-        r: {idx: copy.deepcopy(chunk) for idx, chunk in chunks.items()}
-        for r, chunks in initial_holdings.items()
-    }
+    ranks = np.arange(num_procs)
+    holdings = initial_holdings.copy()
+    rounds: List[Round] = []
 
     for step in range(num_procs - 1):
-        transmissions: Dict[int, Dict] = {}
-        rows: List[Dict] = []
-
-        for r in range(num_procs):
-            send_to = (r + 1) % num_procs
-            recv_from = (r - 1 + num_procs) % num_procs
-            send_idx = last_received[r]
-            chunk = holdings[r][send_idx]
-
-            transmissions[send_to] = {
-                "sender": r,
-                "chunk_idx": send_idx,
-                "chunk": copy.deepcopy(chunk),
-            }
-            rows.append(
-                {
-                    "process": r,
-                    "send_to": send_to,
-                    "recv_from": recv_from,
-                    "send_chunk": f"C{send_idx}",
-                    "send_label": format_chunk(chunk),
-                    "bytes_sent": chunk_bytes,
-                }
-            )
+        send_idx = last_received
+        send_masks = holdings[ranks, send_idx]
 
-        for row in rows:
-            r = row["process"]
-            incoming = transmissions[r]
-            recv_chunk = incoming["chunk"]
-            recv_idx = incoming["chunk_idx"]
-
-            if recv_idx not in holdings[r]:
-                holdings[r][recv_idx] = recv_chunk
-            last_received[r] = recv_idx
-
-            row.update(
-                {
-                    "recv_chunk": f"C{recv_idx}",
-                    "recv_label": format_chunk(recv_chunk),
-                    "bytes_recv": chunk_bytes,
-                    "data_held": summarize_holdings(holdings[r]),
-                }
-            )
+        recv_idx = np.roll(send_idx, 1)
+        recv_masks = np.roll(send_masks, 1)
+        missing = holdings[ranks, recv_idx] == EMPTY
+        holdings[ranks[missing], recv_idx[missing]] = recv_masks[missing]
+        last_received = recv_idx
+
+        rows = build_rows(num_procs, chunk_bytes, holdings, send_idx, send_masks, recv_idx, recv_masks)
+        rounds.append((step, rows, "Allgather"))
 
-        render_step(step, rows, "Allgather", num_procs, output_dir)
+    return rounds
 
 
 def main():
@@ -290,10 +364,14 @@ def main():
         default=Path("torus_rounds"),
         help="Directory for generated PNGs (default: torus_rounds)",
     )
+    parser.add_argument("--dpi", type=int, default=150, help="Output resolution in DPI (default: 150)")
     args = parser.parse_args()
+    if not 1 <= args.processes <= MAX_PROCS:
+        parser.error(f"--processes must be between 1 and {MAX_PROCS}")
 
-    holdings, last_recv = simulate_reduce_scatter(args.processes, args.vector_size, args.output_dir)
-    simulate_allgather(args.processes, args.vector_size, args.output_dir, holdings, last_recv)
+    holdings, last_recv, rounds = simulate_reduce_scatter(args.processes, args.vector_size)
+    rounds += simulate_allgather(args.processes, args.vector_size, holdings, last_recv)
+    render_rounds(rounds, args.processes, args.output_dir, args.dpi)
 
 
 if __name__ == "__main__":